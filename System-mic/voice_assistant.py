@@ -1,58 +1,74 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import speech_recognition as sr
-import pyttsx3
-import time
-import threading
 import os
 import re
+import time
 import warnings
 import sys
 
-# Redirecionar stderr do ALSA para /dev/null ANTES de qualquer importação de áudio
-class SuppressStderr:
-    def __init__(self):
-        self.null_fd = os.open(os.devnull, os.O_RDWR)
-        self.save_fd = os.dup(2)
-        
-    def __enter__(self):
-        os.dup2(self.null_fd, 2)
-        
-    def __exit__(self, *args):
-        os.dup2(self.save_fd, 2)
-        os.close(self.null_fd)
-        os.close(self.save_fd)
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from core.assistant import Assistant
+from core.audio_source import PyAudioSource, FlightLogSource, find_device, M305_KEYWORDS
+from core.engine import StreamingEngine
+from core.flight_recorder import FlightRecorder
+from core.tts import StreamingSpeaker, Pyttsx3Engine
+from core.runtime import SuppressStderr, shared_tts
+
+# Gravador de voo (opcional): guarda os últimos minutos de PCM bruto e as frases
+RECORDER_DIR = os.environ.get('VOZ_RECORDER_DIR')  # Ex: 'flight_recorder'
+RECORDER_MINUTES = 5
 
 # Suprimir todos os logs do ALSA
 os.environ['ALSA_PCM_CARD'] = '2'
 os.environ['ALSA_PCM_DEVICE'] = '0'
 warnings.filterwarnings("ignore")
 
-class VoiceAssistant:
-    def __init__(self):
-        # Wake word para ativação
-        self.wake_words = ['ok google', 'hey google', 'assistente', 'carro']
-        self.is_awake = False
-        self.awake_timeout = 10  # segundos para voltar a dormir
-        self.last_command_time = 0
-        self.always_require_wake_word = True  # Sempre exigir wake word
-        
-        # Detectar microfone M-305 especificamente
-        self.microphone_index = self.find_m305_microphone()
+# Ajustes do engine para o microfone USB
+ENGINE_OPTIONS = {
+    'energy_threshold': 300,
+    'dynamic_energy_threshold': True,
+    'pause_threshold': 0.8,
+    'phrase_threshold': 0.3,
+    'phrase_time_limit': 5,
+}
+
+# Texto do comando 'ajuda'
+HELP_TEXT = """Para usar o assistente, diga a wake word seguida do comando:
+
+Exemplos:
+- 'Assistente, tocar música'
+- 'OK Google, ligar para João'
+- 'Carro, navegar para casa'
+
+Comandos disponíveis:
+Chamadas: ligar para, atender, desligar chamada, discagem rápida.
+Música: tocar música, aumentar volume, diminuir volume, próxima, anterior.
+Navegação: navegar para, rotas alternativas, onde estou, cancelar rota.
+Mensagens: enviar mensagem, última mensagem, ler mensagem.
+Sistema: ajuda, status.
+
+Para encerrar: 'Assistente, tchau' ou 'Assistente, pode parar'."""
+
+class VoiceAssistant(Assistant):
+    param_commands = ['ligar para', 'tocar', 'navegar para', 'enviar mensagem', 'discagem']
+    greeting = "Assistente de voz iniciado. Diga 'Assistente' para começar."
+    unknown_command = "Comando não reconhecido. Diga 'ajuda' para ver os comandos disponíveis."
+    
+    def __init__(self, source=None):
+        if source is None:
+            # Detectar microfone M-305 especificamente
+            source = PyAudioSource(self.find_m305_microphone(), keywords=M305_KEYWORDS)
+            if source.device_index is None:
+                print("⚠️ M-305 não encontrado, usando microfone padrão")
         
-        # Inicializar reconhecimento de voz
-        self.recognizer = sr.Recognizer()
-        if self.microphone_index is not None:
-            self.microphone = sr.Microphone(device_index=self.microphone_index)
-        else:
-            print("⚠️ M-305 não encontrado, usando microfone padrão")
-            self.microphone = sr.Microphone()
+        # Gravador de voo (não grava de novo um replay)
+        recorder = None
+        if RECORDER_DIR and source.live:
+            recorder = FlightRecorder(RECORDER_DIR, mic_name=source.name, minutes=RECORDER_MINUTES)
+            print(f"Gravador de voo ativo em {RECORDER_DIR}")
         
-        # Inicializar síntese de voz
-        with SuppressStderr():
-            self.tts = pyttsx3.init()
-        self.setup_tts()
+        super().__init__(source, recorder, **ENGINE_OPTIONS)
         
         # Configurar microfone
         self.setup_microphone()
@@ -89,142 +105,28 @@ class VoiceAssistant:
             'status': self.status
         }
         
-        self.is_listening = False
-        
-    def setup_tts(self):
-        """Configura síntese de voz"""
-        voices = self.tts.getProperty('voices')
-        
-        # Procurar voz em português
-        portuguese_voice = None
-        if voices:
-            for voice in voices:
-                # Procurar vozes que contenham 'pt', 'brazil', 'portuguese' no nome
-                if any(keyword in voice.name.lower() for keyword in ['pt', 'brazil', 'portuguese', 'brasil']):
-                    portuguese_voice = voice.id
-                    print(f"Voz em português encontrada: {voice.name}")
-                    break
-        
-        # Se encontrou voz em português, usar ela; senão usar a primeira
-        if portuguese_voice:
-            self.tts.setProperty('voice', portuguese_voice)
-        elif voices:
-            self.tts.setProperty('voice', voices[0].id)
-            print("Usando voz padrão (pode estar em inglês)")
-        
-        # Configurar velocidade e volume para voz mais natural
-        self.tts.setProperty('rate', 160)  # Velocidade mais lenta para soar mais natural
-        self.tts.setProperty('volume', 0.85)  # Volume um pouco menor
-        
-        # Tentar usar voz feminina se disponível (geralmente mais natural)
-        if voices:
-            for voice in voices:
-                voice_name = voice.name.lower()
-                # Procurar vozes femininas brasileiras/portuguesas
-                if any(keyword in voice_name for keyword in ['female', 'feminina', 'woman', 'maria', 'ana', 'lucia']):
-                    if any(lang in voice_name for lang in ['pt', 'brazil', 'portuguese', 'brasil']):
-                        self.tts.setProperty('voice', voice.id)
-                        print(f"Voz feminina brasileira encontrada: {voice.name}")
-                        break
-        
     def find_m305_microphone(self):
         """Encontra o microfone M-305 especificamente"""
         print("🔍 Procurando microfone M-305...")
         
         with SuppressStderr():
-            microphones = sr.Microphone.list_microphone_names()
+            index = find_device()
         
-        # Procurar por palavras-chave do M-305
-        m305_keywords = ['USB PnP Sound Device', 'M-305', 'USB Audio', 'Sound Device']
-        
-        for index, name in enumerate(microphones):
-            print(f"  {index}: {name}")
-            for keyword in m305_keywords:
-                if keyword.lower() in name.lower():
-                    print(f"✅ M-305 encontrado no índice {index}: {name}")
-                    return index
-        
-        print("❌ M-305 não encontrado automaticamente")
-        return None
+        if index is not None:
+            print(f"✅ M-305 encontrado no índice {index}")
+        else:
+            print("❌ M-305 não encontrado automaticamente")
+        return index
     
     def setup_microphone(self):
         """Configura e ajusta microfone"""
-        if self.microphone_index is not None:
-            print(f"Configurando microfone M-305 (índice {self.microphone_index})...")
+        if getattr(self.source, 'device_index', None) is not None:
+            print(f"Configurando microfone M-305 (índice {self.source.device_index})...")
         else:
             print("Configurando microfone padrão...")
-            
-        with SuppressStderr():
-            with self.microphone as source:
-                print("Ajustando para ruído ambiente... (aguarde 3 segundos)")
-                # Aumentar tempo de ajuste e diminuir threshold para microfones USB
-                self.recognizer.adjust_for_ambient_noise(source, duration=3)
-                
-                # Configurações específicas para microfone USB
-                self.recognizer.energy_threshold = max(300, self.recognizer.energy_threshold)
-                self.recognizer.dynamic_energy_threshold = True
-                self.recognizer.pause_threshold = 0.8
-                self.recognizer.phrase_threshold = 0.3
-                
-                print(f"Nível de ruído configurado: {self.recognizer.energy_threshold}")
-    
-    def speak(self, text):
-        """Fala o texto usando TTS"""
-        print(f"Assistente: {text}")
-        with SuppressStderr():
-            self.tts.say(text)
-            self.tts.runAndWait()
-    
-    def listen_for_wake_word_and_command(self):
-        """Escuta por wake word + comando na mesma frase"""
-        try:
-            with SuppressStderr():
-                with self.microphone as source:
-                    # Escuta mais longa para capturar wake word + comando
-                    audio = self.recognizer.listen(source, timeout=1, phrase_time_limit=5)
-                
-                # Usar Google Speech Recognition
-                full_command = self.recognizer.recognize_google(audio, language='pt-BR')
-                full_command_lower = full_command.lower()
-                
-                # Verificar se contém wake word
-                wake_word_found = None
-                for wake_word in self.wake_words:
-                    if wake_word in full_command_lower:
-                        wake_word_found = wake_word
-                        break
-                
-                if wake_word_found:
-                    # Extrair comando removendo a wake word
-                    command = full_command_lower.replace(wake_word_found, '').strip()
-                    # Remover vírgulas e pontuações que podem aparecer após wake word
-                    command = re.sub(r'^[,.\s]+', '', command)
-                    
-                    print(f"Wake word '{wake_word_found}' detectada. Comando: '{command}'")
-                    return command if command else None
-                        
-                return None
-                
-        except (sr.WaitTimeoutError, sr.UnknownValueError, sr.RequestError):
-            return None
-    
-    def process_command(self, command):
-        """Processa comando recebido"""
-        if not command:
-            return
-            
-        # Buscar comando nas palavras-chave
-        for keyword, action in self.commands.items():
-            if keyword in command:
-                if keyword in ['ligar para', 'tocar', 'navegar para', 'enviar mensagem', 'discagem']:
-                    # Comandos que precisam de parâmetros
-                    action(command)
-                else:
-                    action()
-                return
-                
-        # Comando não reconhecido
-        self.speak("Comando não reconhecido. Diga 'ajuda' para ver os comandos disponíveis.")
+        
+        # O stream fica aberto, então a calibração é feita uma única vez
+        self.calibrate(3)
     
     # === COMANDOS DE CHAMADAS ===
     def make_call(self, command):
@@ -330,123 +232,70 @@ class VoiceAssistant:
     
     def help(self):
         """Lista de comandos"""
-        help_text = """Para usar o assistente, diga a wake word seguida do comando:
-        
-        Exemplos:
-        - 'Assistente, tocar música'
-        - 'OK Google, ligar para João'
-        - 'Carro, navegar para casa'
-        
-        Comandos disponíveis:
-        Chamadas: ligar para, atender, desligar chamada, discagem rápida.
-        Música: tocar música, aumentar volume, diminuir volume, próxima, anterior.
-        Navegação: navegar para, rotas alternativas, onde estou, cancelar rota.
-        Mensagens: enviar mensagem, última mensagem, ler mensagem.
-        Sistema: ajuda, status.
-        
-        Para encerrar: 'Assistente, tchau' ou 'Assistente, pode parar'."""
-        self.speak(help_text)
-    
-    def start_listening(self):
-        """Inicia loop principal com wake word + comando"""
-        self.speak("Assistente de voz iniciado. Diga 'Assistente' para começar.")
-        self.is_listening = True
-        
-        while self.is_listening:
-            try:
-                # Sempre escutando por wake word + comando na mesma frase
-                print("� Aguardando comando... (Ex: 'Assistente, tocar música')")
-                
-                command = self.listen_for_wake_word_and_command()
-                if command:
-                    self.process_command(command)
-                    
-                    # Verificar se comando é para encerrar
-                    if any(word in command for word in ['tchau', 'obrigado', 'até logo', 'pode parar', 'encerrar']):
-                        break
-                
-                time.sleep(0.1)  # Pequena pausa para evitar uso excessivo de CPU
-                
-            except KeyboardInterrupt:
-                self.speak("Encerrando assistente")
-                break
-            except Exception as e:
-                print(f"Erro: {e}")
-                time.sleep(1)
+        self.speak(HELP_TEXT)
 
 def test_microphone():
     """Testa se o microfone está funcionando"""
-    r = sr.Recognizer()
-    
     print("Testando microfone M-305...")
     print("Microfones disponíveis:")
     
     # Encontrar M-305
-    microphone_index = None
-    m305_keywords = ['USB PnP Sound Device', 'M-305', 'USB Audio', 'Sound Device']
-    
     with SuppressStderr():
-        microphones = sr.Microphone.list_microphone_names()
-        
-    for index, name in enumerate(microphones):
-        print(f"  {index}: {name}")
-        for keyword in m305_keywords:
-            if keyword.lower() in name.lower():
-                microphone_index = index
-                print(f"✅ M-305 encontrado no índice {index}")
-                break
+        microphone_index = find_device()
     
     if microphone_index is None:
         print("❌ M-305 não encontrado. Usando microfone padrão.")
-        microphone = sr.Microphone()
     else:
-        microphone = sr.Microphone(device_index=microphone_index)
+        print(f"✅ M-305 encontrado no índice {microphone_index}")
     
+    source = PyAudioSource(microphone_index)
+    engine = None
     try:
         with SuppressStderr():
-            with microphone as source:
-                print("Ajustando para ruído ambiente... (3 segundos)")
-                r.adjust_for_ambient_noise(source, duration=3)
-                
-                # Configurações otimizadas para USB
-                r.energy_threshold = max(300, r.energy_threshold)
-                r.dynamic_energy_threshold = True
-                r.pause_threshold = 0.8
-                r.phrase_threshold = 0.3
-                
-                print(f"Nível de ruído: {r.energy_threshold}")
-                print("Fale algo para testar (você tem 10 segundos):")
-                
-                audio = r.listen(source, timeout=10, phrase_time_limit=5)
-                
-            print("Processando áudio...")
-            text = r.recognize_google(audio, language='pt-BR')
-            print(f"✅ Texto reconhecido: '{text}'")
-            return True
+            source.open()
+        engine = StreamingEngine(source, **ENGINE_OPTIONS)
+        engine.start()
+        
+        print("Ajustando para ruído ambiente... (3 segundos)")
+        engine.calibrate(3)
+        print(f"Nível de ruído: {engine.energy_threshold:.0f}")
+        print("Fale algo para testar (você tem 10 segundos):")
+        
+        utterance = next(engine.utterances(timeout=10), None)
+        if utterance is None:
+            print("❌ Timeout: Nenhum áudio detectado. Verifique se o microfone está funcionando.")
+            print("💡 Dicas:")
+            print("   - Fale mais próximo do microfone")
+            print("   - Verifique se o microfone não está mudo")
+            print("   - Teste com: pulseaudio --check -v")
+            return False
+        
+        print("Processando áudio...")
+        text = engine.recognize(utterance)
+        if not text:
+            print("❌ Áudio detectado mas não foi possível reconhecer a fala")
+            print("💡 Dicas:")
+            print("   - Fale mais claramente")
+            print("   - Verifique se há muito ruído de fundo")
+            return False
+        
+        print(f"✅ Texto reconhecido: '{text}'")
+        return True
         
-    except sr.WaitTimeoutError:
-        print("❌ Timeout: Nenhum áudio detectado. Verifique se o microfone está funcionando.")
-        print("💡 Dicas:")
-        print("   - Fale mais próximo do microfone")
-        print("   - Verifique se o microfone não está mudo")
-        print("   - Teste com: pulseaudio --check -v")
-        return False
-    except sr.UnknownValueError:
-        print("❌ Áudio detectado mas não foi possível reconhecer a fala")
-        print("💡 Dicas:")
-        print("   - Fale mais claramente")
-        print("   - Verifique se há muito ruído de fundo")
-        return False
     except Exception as e:
         print(f"❌ Erro no teste do microfone: {e}")
         return False
+    finally:
+        if engine:
+            engine.stop()
+        source.close()
 
 def test_voices():
     """Testa vozes disponíveis no sistema"""
     print("Testando vozes TTS disponíveis...")
     
     with SuppressStderr():
-        engine = pyttsx3.init()
+        engine = shared_tts()  # O mesmo motor será usado pelo assistente
         voices = engine.getProperty('voices')
     
     if not voices:
@@ -487,11 +336,56 @@ def test_voices():
         engine.stop()
     return True
 
+def benchmark_tts():
+    """Mede tempo até o primeiro áudio e tempo total falando o texto de ajuda"""
+    print("Medindo TTS com o texto de ajuda...")
+    
+    with SuppressStderr():
+        engine = Pyttsx3Engine(shared_tts())
+    if not engine.streaming:
+        # Sem player, a fala é direta e não há síntese separada para medir
+        print(f"❌ Benchmark indisponível: instale o {engine.player[0]} (pacote alsa-utils)")
+        return None
+    
+    try:
+        with SuppressStderr():
+            # Bloco único: tudo é sintetizado antes do primeiro som
+            started = time.time()
+            clip = engine.synthesize(HELP_TEXT)
+            block_first_audio = time.time() - started
+            engine.play(clip)
+            block_total = time.time() - started
+            
+            # Streaming: toca uma frase enquanto sintetiza a próxima
+            stats = StreamingSpeaker(engine).speak(HELP_TEXT)
+    except Exception as e:
+        print(f"❌ Erro na síntese: {e}")
+        return None
+    
+    print(f"Bloco único: primeiro áudio {block_first_audio:.2f}s, total {block_total:.2f}s")
+    if stats['first_audio'] is None:
+        print(f"Streaming ({stats['chunks']} trechos): nenhum áudio tocado (falha na síntese)")
+    else:
+        print(f"Streaming ({stats['chunks']} trechos): primeiro áudio {stats['first_audio']:.2f}s, total {stats['total']:.2f}s")
+    return stats
+
 if __name__ == "__main__":
     print("=== Assistente de Voz para Carro ===")
     print("Google Dev Board (AA1) - Microfone M-305")
     print()
     
+    if len(sys.argv) > 1 and sys.argv[1] == '--bench-tts':
+        benchmark_tts()
+        sys.exit(0)
+    
+    # Replay do gravador de voo: python3 voice_assistant.py --replay DIR [velocidade]
+    if len(sys.argv) > 2 and sys.argv[1] == '--replay':
+        speed = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+        print(f"Replay de {sys.argv[2]} (velocidade {speed}x)")
+        assistant = VoiceAssistant(source=FlightLogSource(sys.argv[2], 'usb', speed=speed))
+        assistant.start_listening()
+        sys.exit(0)
+    
     # Testar vozes TTS primeiro
     print("1. Testando sistema de voz...")
     test_voices()
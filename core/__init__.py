@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Módulos compartilhados entre o System-mic e o System-arduino"""
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+"""Assistente base compartilhado pelo System-mic e pelo System-arduino.
+
+Contém a configuração da voz, a detecção de wake word, o despacho de
+comandos e o laço principal sobre o StreamingEngine. Cada sistema só
+escolhe a fonte de áudio, os ajustes do engine e a tabela de comandos.
+"""
+
+import re
+import socket
+
+from core.engine import StreamingEngine
+from core.runtime import SuppressStderr, shared_tts
+from core.supervisor import Supervisor
+from core.tts import StreamingSpeaker, Pyttsx3Engine
+
+WAKE_WORDS = ['ok google', 'hey google', 'assistente', 'carro']
+PORTUGUESE_KEYWORDS = ['pt', 'brazil', 'portuguese', 'brasil']
+FEMALE_KEYWORDS = ['female', 'feminina', 'woman', 'maria', 'ana', 'lucia']
+
+
+def setup_tts(tts):
+    """Escolhe uma voz em português (de preferência feminina) e ajusta ritmo e volume"""
+    voices = tts.getProperty('voices')
+
+    # Procurar voz em português
+    portuguese_voice = None
+    if voices:
+        for voice in voices:
+            if any(keyword in voice.name.lower() for keyword in PORTUGUESE_KEYWORDS):
+                portuguese_voice = voice.id
+                print(f"Voz em português encontrada: {voice.name}")
+                break
+
+    # Se encontrou voz em português, usar ela; senão usar a primeira
+    if portuguese_voice:
+        tts.setProperty('voice', portuguese_voice)
+    elif voices:
+        tts.setProperty('voice', voices[0].id)
+        print("Usando voz padrão (pode estar em inglês)")
+
+    # Velocidade mais lenta e volume um pouco menor soam mais naturais
+    tts.setProperty('rate', 160)
+    tts.setProperty('volume', 0.85)
+
+    # Tentar usar voz feminina brasileira se disponível (geralmente mais natural)
+    if voices:
+        for voice in voices:
+            voice_name = voice.name.lower()
+            if any(keyword in voice_name for keyword in FEMALE_KEYWORDS):
+                if any(lang in voice_name for lang in PORTUGUESE_KEYWORDS):
+                    tts.setProperty('voice', voice.id)
+                    print(f"Voz feminina brasileira encontrada: {voice.name}")
+                    break
+
+
+class Assistant:
+    """Laço wake word + comando sobre qualquer AudioSource"""
+
+    wake_words = WAKE_WORDS
+    exit_words = ['tchau', 'obrigado', 'até logo', 'pode parar', 'encerrar']
+    param_commands = []  # Comandos que recebem o texto completo como parâmetro
+    greeting = "Sistema iniciado"
+    farewell = "Encerrando assistente"
+    unknown_command = "Comando não reconhecido"
+
+    def __init__(self, source, recorder=None, **engine_options):
+        self.source = source
+        self.recorder = recorder
+        self.commands = {}
+        self.is_listening = False
+
+        # Inicializar síntese de voz
+        with SuppressStderr():
+            self.tts = shared_tts()
+        setup_tts(self.tts)
+        # Fala em trechos: toca uma frase enquanto sintetiza a próxima
+        self.speaker = StreamingSpeaker(Pyttsx3Engine(self.tts))
+
+        # Abrir a fonte uma única vez; a captura segue em paralelo até o fim
+        while True:
+            try:
+                with SuppressStderr():
+                    self.source.open()
+                break
+            except socket.timeout:
+                pass  # Arduino ainda não conectou: continuar esperando no mesmo socket
+        self.engine = StreamingEngine(source, recorder, **engine_options)
+        self.engine.start()
+
+        # Fontes ao vivo: reabrir e reiniciar a captura se caírem ou travarem
+        self.supervisor = None
+        if source.live:
+            self.supervisor = Supervisor()
+            self.supervisor.watch(self.engine)
+            self.supervisor.start()
+
+    def calibrate(self, seconds):
+        """Ajusta o limiar de energia ao ruído ambiente"""
+        if not self.source.live:
+            # Replay/arquivo: não gastar o começo da gravação e manter o resultado repetível
+            self.engine.energy_threshold = self.engine.min_energy_threshold
+            self.engine.dynamic_energy_threshold = False
+            print(f"Fonte gravada: limiar fixo em {self.engine.energy_threshold:.0f}")
+            return
+        print(f"Ajustando para ruído ambiente... (aguarde {seconds:g} segundos)")
+        threshold = self.engine.calibrate(seconds)
+        print(f"Nível de ruído configurado: {threshold:.0f}")
+
+    def speak(self, text):
+        """Fala o texto usando TTS"""
+        print(f"Assistente: {text}")
+        with SuppressStderr():
+            stats = self.speaker.speak(text)
+        # Descartar o que foi captado enquanto o assistente falava (eco da própria voz)
+        self.engine.discard_pending()
+        return stats
+
+    def extract_command(self, text):
+        """Retorna o comando que segue a wake word, ou None se não houver wake word"""
+        for wake_word in self.wake_words:
+            if wake_word in text:
+                command = text.replace(wake_word, '').strip()
+                # Remover vírgulas e pontuações que podem aparecer após wake word
+                command = re.sub(r'^[,.\s]+', '', command)
+                print(f"Wake word '{wake_word}' detectada. Comando: '{command}'")
+                return command
+        return None
+
+    def process_command(self, command):
+        """Processa comando recebido"""
+        for keyword, action in self.commands.items():
+            if keyword in command:
+                if keyword in self.param_commands:
+                    action(command)
+                else:
+                    action()
+                return
+
+        self.speak(self.unknown_command)
+
+    def start_listening(self):
+        """Inicia loop principal com wake word + comando"""
+        self.speak(self.greeting)
+        self.is_listening = True
+
+        try:
+            for utterance in self.engine.utterances():
+                try:
+                    text = self.engine.recognize(utterance)
+                    if not text:
+                        continue
+                    print(f"Você disse: {text}")
+
+                    command = self.extract_command(text.lower())
+                    if not command:
+                        continue
+
+                    # Verificar se comando é para encerrar
+                    if any(word in command for word in self.exit_words):
+                        self.speak(self.farewell)
+                        break
+
+                    self.process_command(command)
+                except Exception as e:
+                    # A captura segue em paralelo; só esta frase é perdida
+                    print(f"Erro: {e}")
+                if not self.is_listening:
+                    break
+            else:
+                print("Fonte de áudio encerrada")
+        except KeyboardInterrupt:
+            self.speak(self.farewell)
+        finally:
+            self.close()
+
+    def close(self):
+        self.is_listening = False
+        if self.supervisor:
+            self.supervisor.stop()
+            self.supervisor.report()
+        self.engine.stop()
+        self.source.close()
+        if self.recorder:
+            self.recorder.close()
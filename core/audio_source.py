@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+"""Fontes de áudio com a mesma interface para os dois sistemas.
+
+Toda fonte entrega frames de tamanho fixo (PCM 16-bit mono) pelo gerador
+frames(). O StreamingEngine só conhece essa interface, então o microfone
+USB, o Arduino (WiFi ou Serial), um WAV ou áudio sintético passam pelo
+mesmo caminho, e os dois últimos permitem benchmarks sem hardware.
+"""
+
+import array
+import math
+import random
+import socket
+import threading
+import time
+import wave
+
+from core import runtime
+from core.flight_recorder import FlightLog
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit
+FRAME_SAMPLES = 512  # Mesmo bloco que o Arduino envia: 32 ms a 16 kHz
+
+# Palavras-chave do microfone USB M-305
+M305_KEYWORDS = ['USB PnP Sound Device', 'M-305', 'USB Audio', 'Sound Device']
+
+
+class AudioSource:
+    """Base das fontes: subclasses implementam open(), read() e close()"""
+
+    name = 'audio'
+    live = True  # Fonte ao vivo: se o consumidor atrasar, frames antigos são descartados
+    first_sample = 0  # Posição (em amostras) do primeiro frame entregue
+
+    def __init__(self, sample_rate=SAMPLE_RATE, frame_samples=FRAME_SAMPLES):
+        self.sample_rate = sample_rate
+        self.sample_width = SAMPLE_WIDTH
+        self.frame_samples = frame_samples
+        self.frame_bytes = frame_samples * SAMPLE_WIDTH
+        self.pending = bytearray()
+
+    @property
+    def frame_seconds(self):
+        return self.frame_samples / float(self.sample_rate)
+
+    def open(self):
+        pass
+
+    def read(self, size):
+        """Lê até size bytes, bloqueando. b'' significa fim da fonte"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def disconnect(self):
+        """Derruba só a conexão atual (acorda uma leitura bloqueada); padrão: close()"""
+        self.close()
+
+    def reopen(self):
+        """Reconecta a fonte (usado pelo supervisor na recuperação)"""
+        self.disconnect()
+        self.pending.clear()
+        self.open()
+
+    def frames(self):
+        """Gera frames de exatamente frame_bytes até a fonte acabar"""
+        while True:
+            while len(self.pending) < self.frame_bytes:
+                data = self.read(self.frame_bytes - len(self.pending))
+                if not data:
+                    return  # Restos menores que um frame são descartados
+                self.pending.extend(data)
+            frame = bytes(self.pending[:self.frame_bytes])
+            del self.pending[:self.frame_bytes]
+            yield frame
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def list_devices():
+    """Nomes dos dispositivos PyAudio, na ordem dos índices"""
+    pyaudio = runtime.load('pyaudio')
+    audio = pyaudio.PyAudio()
+    try:
+        return [audio.get_device_info_by_index(i).get('name')
+                for i in range(audio.get_device_count())]
+    finally:
+        audio.terminate()
+
+
+def find_device(keywords=M305_KEYWORDS, verbose=True):
+    """Índice do primeiro dispositivo cujo nome contém uma das palavras-chave"""
+    for index, name in enumerate(list_devices()):
+        if verbose:
+            print(f"  {index}: {name}")
+        for keyword in keywords:
+            if keyword.lower() in name.lower():
+                return index
+    return None
+
+
+class PyAudioSource(AudioSource):
+    """Microfone local via PyAudio. O stream fica aberto entre as frases.
+
+    Com keywords, o dispositivo é procurado de novo em reopen(), então o
+    índice é corrigido se o microfone for desconectado e reconectado.
+
+    read() só chama stream.read() quando os dados já chegaram, e close()
+    espera a leitura em andamento: o PortAudio não aceita fechar o stream
+    com outra thread bloqueada nele (supervisor com o microfone travado).
+    """
+
+    name = 'usb'
+    poll_interval = 0.005  # Espera entre consultas a get_read_available()
+
+    def __init__(self, device_index=None, keywords=None, **kwargs):
+        super().__init__(**kwargs)
+        self.device_index = device_index
+        self.keywords = keywords
+        self.audio = None
+        self.stream = None
+        self.closed = True
+        self.lock = threading.Lock()  # Uma chamada ao stream por vez
+
+    def open(self):
+        pyaudio = runtime.load('pyaudio')
+        self.audio = pyaudio.PyAudio()
+        self.stream = self.audio.open(format=pyaudio.paInt16, channels=1,
+                                      rate=self.sample_rate, input=True,
+                                      input_device_index=self.device_index,
+                                      frames_per_buffer=self.frame_samples)
+        self.closed = False
+
+    def read(self, size):
+        frames = max(1, size // self.sample_width)
+        while not self.closed:
+            with self.lock:
+                if self.closed:
+                    break
+                if self.stream.get_read_available() >= frames:
+                    return self.stream.read(frames, exception_on_overflow=False)
+            time.sleep(self.poll_interval)
+        return b''  # Fechada por close(): a captura termina sem tocar no stream
+
+    def close(self):
+        self.closed = True
+        with self.lock:
+            if self.stream:
+                self.stream.stop_stream()
+                self.stream.close()
+                self.stream = None
+            if self.audio:
+                self.audio.terminate()
+                self.audio = None
+
+    def reopen(self):
+        self.close()
+        self.pending.clear()
+        if self.keywords:
+            # Depois de reconectar, o USB pode voltar com outro índice
+            index = find_device(self.keywords, verbose=False)
+            if index is not None and index != self.device_index:
+                print(f"Microfone reencontrado no índice {index}")
+                self.device_index = index
+        self.open()
+
+
+class ArduinoTCPSource(AudioSource):
+    """Arduino via WiFi: o Dev Board escuta e o Arduino conecta.
+
+    O socket de escuta fica aberto entre as tentativas de accept() (um
+    Arduino que já conectou na fila não é derrubado) e só é refeito se ele
+    próprio falhar.
+    """
+
+    name = 'arduino'
+
+    def __init__(self, port=5555, host='0.0.0.0', accept_timeout=None, **kwargs):
+        super().__init__(**kwargs)
+        self.host = host
+        self.port = port
+        self.accept_timeout = accept_timeout
+        self.sock = None
+        self.conn = None
+        self.addr = None
+
+    def open(self):
+        if self.sock is None:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            self.sock.bind((self.host, self.port))
+            self.sock.listen(1)
+            self.port = self.sock.getsockname()[1]  # Porta real quando port=0
+        print(f"Aguardando Arduino na porta {self.port}...")
+        self.sock.settimeout(self.accept_timeout)
+        try:
+            self.conn, self.addr = self.sock.accept()
+        except socket.timeout:
+            raise  # Ninguém conectou ainda; a próxima tentativa usa o mesmo socket
+        except OSError:
+            self.close()  # Socket de escuta com problema: refazer na próxima
+            raise
+        self.conn.settimeout(None)
+        print(f"Arduino conectado de {self.addr}")
+
+    def read(self, size):
+        data = self.conn.recv(max(size, 1024))
+        if not data:
+            print("Conexão WiFi perdida")
+        return data
+
+    def disconnect(self):
+        if self.conn:
+            try:
+                # Acorda um recv() bloqueado em outra thread
+                self.conn.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            self.conn.close()
+            self.conn = None
+
+    def close(self):
+        self.disconnect()
+        if self.sock:
+            self.sock.close()
+            self.sock = None
+
+
+class ArduinoSerialSource(AudioSource):
+    """Arduino via cabo USB (porta serial)"""
+
+    name = 'arduino'
+
+    def __init__(self, port='/dev/ttyACM0', baud=115200, **kwargs):
+        super().__init__(**kwargs)
+        self.port = port
+        self.baud = baud
+        self.ser = None
+
+    def open(self):
+        serial = runtime.load('serial')
+        self.ser = serial.Serial(self.port, self.baud, timeout=0.1)
+        self.ser.reset_input_buffer()
+        print(f"Serial conectada em {self.port}")
+        time.sleep(2)  # Aguardar Arduino inicializar
+
+    def read(self, size):
+        while True:
+            data = self.ser.read(max(size, self.ser.in_waiting))
+            if data:
+                return data
+
+    def close(self):
+        if self.ser:
+            self.ser.close()
+            self.ser = None
+
+
+class WavFileSource(AudioSource):
+    """Arquivo WAV 16-bit mono; speed > 0 reproduz no ritmo do tempo real"""
+
+    name = 'wav'
+    live = False
+
+    def __init__(self, path, speed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.path = path
+        self.speed = speed
+        self.wav = None
+
+    def open(self):
+        self.wav = wave.open(self.path, 'rb')
+        if self.wav.getsampwidth() != SAMPLE_WIDTH or self.wav.getnchannels() != 1:
+            raise ValueError(f"{self.path}: esperado WAV 16-bit mono")
+        self.sample_rate = self.wav.getframerate()
+        self.started = time.monotonic()
+        self.sent = 0
+
+    def read(self, size):
+        data = self.wav.readframes(size // self.sample_width)
+        if self.speed > 0 and data:
+            self.sent += len(data)
+            due = self.started + self.sent / float(self.sample_rate * self.sample_width) / self.speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        return data
+
+    def close(self):
+        if self.wav:
+            self.wav.close()
+            self.wav = None
+
+
+class SyntheticSource(AudioSource):
+    """Áudio gerado: lista de (tipo, segundos) com tipo 'silence', 'noise' ou 'tone'.
+
+    Determinístico (semente fixa), útil para benchmark do engine sem microfone.
+    """
+
+    name = 'synthetic'
+    live = False
+
+    def __init__(self, pattern=(('silence', 1.0), ('tone', 1.5), ('silence', 1.0)),
+                 amplitude=4000, noise=30, frequency=440.0, repeat=1, seed=0, **kwargs):
+        super().__init__(**kwargs)
+        self.pattern = list(pattern)
+        self.amplitude = amplitude
+        self.noise = noise
+        self.frequency = frequency
+        self.repeat = repeat
+        self.seed = seed
+        self.chunks = None
+
+    def open(self):
+        self.chunks = self._generate()
+
+    def _generate(self):
+        rng = random.Random(self.seed)
+        step = 2 * math.pi * self.frequency / self.sample_rate
+        n = 0
+        for _ in range(self.repeat):
+            for kind, seconds in self.pattern:
+                remaining = int(seconds * self.sample_rate)
+                while remaining > 0:
+                    count = min(remaining, self.frame_samples)
+                    samples = array.array('h', [0] * count)
+                    for i in range(count):
+                        value = rng.randint(-self.noise, self.noise)
+                        if kind == 'tone':
+                            value += int(self.amplitude * math.sin(step * n))
+                        elif kind == 'noise':
+                            value += rng.randint(-self.amplitude, self.amplitude)
+                        samples[i] = value
+                        n += 1
+                    remaining -= count
+                    yield samples.tobytes()
+
+    def read(self, size):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            return b''
+
+
+class FlightLogSource(AudioSource):
+    """Reproduz uma gravação do gravador de voo (core.flight_recorder).
+
+    As posições seguem as do log (amostras globais), então as frases do
+    replay podem ser comparadas com as registradas. start e end limitam o
+    trecho reproduzido.
+    """
+
+    name = 'replay'
+    live = False
+
+    def __init__(self, directory, mic_name='usb', speed=1.0, start=None, end=None, **kwargs):
+        super().__init__(**kwargs)
+        self.log = FlightLog(directory, mic_name)
+        self.sample_rate = self.log.sample_rate
+        self.speed = speed
+        self.start = start
+        self.end = end
+        first = self.log.segments[0][1]['first_sample']
+        self.first_sample = first if start is None else max(first, start)
+        self.chunks = None
+
+    def open(self):
+        self.chunks = self.log.paced_chunks(self.frame_bytes, self.speed, self.start, self.end)
+
+    def read(self, size):
+        try:
+            return next(self.chunks)
+        except StopIteration:
+            return b''
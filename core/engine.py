@@ -0,0 +1,261 @@
+# -*- coding: utf-8 -*-
+"""Engine de escuta em streaming, comum aos dois sistemas.
+
+Uma thread de captura lê frames de um AudioSource para uma fila; o
+engine detecta início e fim de fala por energia (como o Recognizer.listen
+do speech_recognition, mas sem reabrir o microfone a cada frase nem usar
+janela fixa) e entrega cada frase ao reconhecimento do Google.
+"""
+
+import array
+import collections
+import math
+import queue
+import threading
+import time
+
+from core import runtime
+
+try:
+    import audioop  # Removido no Python 3.13
+except ImportError:
+    audioop = None
+
+
+def rms(frame):
+    """Energia RMS de um frame PCM 16-bit"""
+    if audioop:
+        return audioop.rms(frame, 2)
+    samples = array.array('h', frame)
+    if not samples:
+        return 0
+    return int(math.sqrt(sum(s * s for s in samples) / float(len(samples))))
+
+
+def amplify(pcm, gain):
+    """Multiplica o PCM 16-bit por gain, saturando em vez de estourar"""
+    if gain == 1:
+        return pcm
+    if audioop:
+        return audioop.mul(pcm, 2, gain)
+    samples = array.array('h', pcm)
+    for i, s in enumerate(samples):
+        samples[i] = max(-32768, min(32767, int(s * gain)))
+    return samples.tobytes()
+
+
+class Utterance:
+    """Uma frase detectada: PCM e posição (em amostras) no fluxo da fonte"""
+
+    def __init__(self, pcm, start, end, sample_rate):
+        self.pcm = pcm
+        self.start = start
+        self.end = end
+        self.sample_rate = sample_rate
+
+    @property
+    def duration(self):
+        return (self.end - self.start) / float(self.sample_rate)
+
+
+class StreamingEngine:
+    """Detecção de frases em fluxo contínuo + reconhecimento"""
+
+    def __init__(self, source, recorder=None, gain=1, energy_threshold=300,
+                 dynamic_energy_threshold=True, pause_threshold=0.8,
+                 phrase_threshold=0.3, phrase_time_limit=5, pre_roll=0.5,
+                 max_buffer=5.0, language='pt-BR'):
+        self.source = source
+        self.recorder = recorder
+        self.gain = gain
+        self.energy_threshold = energy_threshold
+        self.min_energy_threshold = energy_threshold
+        self.dynamic_energy_threshold = dynamic_energy_threshold
+        self.pause_threshold = pause_threshold
+        self.phrase_threshold = phrase_threshold
+        self.phrase_time_limit = phrase_time_limit
+        self.pre_roll = pre_roll
+        self.language = language
+
+        # Fila entre a captura e a detecção; fontes ao vivo descartam o mais antigo
+        self.queue = queue.Queue(maxsize=max(1, int(max_buffer / source.frame_seconds)))
+        self.capture_thread = None
+        self.capture_error = None
+        self.stopping = False  # Pedido de parada, conferido a cada frame
+        self.restartable = False  # Com supervisor, a queda da fonte não encerra frames()
+        self.position = recorder.tell() if recorder else source.first_sample  # Amostras capturadas
+        self.frame_position = self.position  # Fim do último frame entregue
+        self.last_frame_time = None
+        self.started_time = None
+
+    def start(self):
+        """Inicia a thread de captura (a fonte já deve estar aberta)"""
+        self.started_time = time.monotonic()
+        self.stopping = False
+        self.capture_thread = threading.Thread(target=self.capture_loop)
+        self.capture_thread.daemon = True
+        self.capture_thread.start()
+
+    def capture_loop(self):
+        print("Thread de captura iniciada")
+        try:
+            for frame in self.source.frames():
+                if self.stopping:
+                    break
+                if self.recorder:
+                    self.recorder.write(frame)
+                self.position += len(frame) // self.source.sample_width
+                self.last_frame_time = time.monotonic()
+                self._put((self.position, frame))
+        except Exception as e:
+            if not self.stopping:  # Leitura interrompida pelo close() de stop() não é erro
+                print(f"Erro na captura: {e}")
+                self.capture_error = e
+        finally:
+            if not (self.restartable and self.source.live):
+                self._put(None)
+
+    def stop(self, timeout=1.0):
+        """Encerra a thread de captura; chamar antes de fechar a fonte.
+
+        A thread sai no próximo frame. Uma leitura sem dados (socket parado)
+        só volta quando a fonte é fechada, então o join tem limite.
+        """
+        self.stopping = True
+        if self.capture_thread and self.capture_thread is not threading.current_thread():
+            self.capture_thread.join(timeout=timeout)
+
+    @property
+    def capture_alive(self):
+        return self.capture_thread is not None and self.capture_thread.is_alive()
+
+    def _put(self, item):
+        if not self.source.live:
+            # Arquivo/sintético: nenhum frame pode ser perdido (até pedirem parada)
+            while not self.stopping:
+                try:
+                    self.queue.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    pass
+            return
+        while True:
+            try:
+                self.queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                except queue.Empty:
+                    pass
+
+    def frames(self):
+        """Frames capturados, já com ganho; o gravador recebe o PCM bruto"""
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.put(None)  # Outros consumidores também veem o fim
+                return
+            self.frame_position, frame = item
+            yield amplify(frame, self.gain)
+
+    def discard_pending(self):
+        """Descarta o áudio acumulado (ex.: enquanto o assistente falava)"""
+        if not self.source.live:
+            return  # Arquivo/replay: manter determinístico
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is None:
+                self.queue.put(None)
+                return
+
+    def calibrate(self, seconds=1.0):
+        """Ajusta o limiar de energia ao ruído ambiente (como adjust_for_ambient_noise)"""
+        frame_seconds = self.source.frame_seconds
+        damping = 0.15 ** frame_seconds
+        elapsed = 0.0
+        for frame in self.frames():
+            target = rms(frame) * 1.5
+            self.energy_threshold = self.energy_threshold * damping + target * (1 - damping)
+            elapsed += frame_seconds
+            if elapsed >= seconds:
+                break
+        self.energy_threshold = max(self.min_energy_threshold, self.energy_threshold)
+        return self.energy_threshold
+
+    def record(self, seconds):
+        """Lê um trecho de duração fixa (usado nos autotestes)"""
+        pcm = bytearray()
+        wanted = int(seconds * self.source.sample_rate) * self.source.sample_width
+        for frame in self.frames():
+            pcm.extend(frame)
+            if len(pcm) >= wanted:
+                break
+        return bytes(pcm)
+
+    def utterances(self, timeout=None):
+        """Gera as frases detectadas até a fonte acabar.
+
+        timeout: segundos de áudio sem nenhuma fala antes de desistir.
+        """
+        frame_seconds = self.source.frame_seconds
+        damping = 0.15 ** frame_seconds
+        pre_roll = collections.deque(maxlen=max(1, int(self.pre_roll / frame_seconds)))
+        phrase = None
+        waited = 0.0
+
+        for frame in self.frames():
+            energy = rms(frame)
+
+            if phrase is None:
+                if energy > self.energy_threshold:
+                    phrase = list(pre_roll) + [frame]
+                    phrase_start = self.frame_position - len(phrase) * self.source.frame_samples
+                    phrase_time = silent_time = 0.0
+                    pre_roll.clear()
+                    waited = 0.0
+                    continue
+
+                pre_roll.append(frame)
+                if self.dynamic_energy_threshold:
+                    target = energy * 1.5
+                    self.energy_threshold = max(self.min_energy_threshold,
+                                                self.energy_threshold * damping + target * (1 - damping))
+                waited += frame_seconds
+                if timeout and waited > timeout:
+                    return
+                continue
+
+            phrase.append(frame)
+            phrase_time += frame_seconds
+            silent_time = 0.0 if energy > self.energy_threshold else silent_time + frame_seconds
+
+            if silent_time >= self.pause_threshold or phrase_time >= self.phrase_time_limit:
+                if phrase_time - silent_time >= self.phrase_threshold:
+                    yield Utterance(b''.join(phrase), phrase_start, self.frame_position, self.source.sample_rate)
+                phrase = None
+
+        if phrase and phrase_time - silent_time >= self.phrase_threshold:
+            yield Utterance(b''.join(phrase), phrase_start, self.frame_position, self.source.sample_rate)
+
+    def recognize(self, utterance):
+        """Reconhece a frase com o Google. Retorna o texto ou None"""
+        sr = runtime.load('speech_recognition')
+        audio = sr.AudioData(utterance.pcm, utterance.sample_rate, self.source.sample_width)
+        started = time.time()
+        text = None
+        try:
+            text = runtime.shared_recognizer().recognize_google(audio, language=self.language)
+        except sr.UnknownValueError:
+            pass
+        except sr.RequestError as e:
+            print(f"Erro no serviço: {e}")
+        finally:
+            if self.recorder:
+                self.recorder.log_utterance(utterance.start, utterance.end, text,
+                                            duration=utterance.duration,
+                                            recognize=time.time() - started)
+        return text
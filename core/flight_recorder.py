@@ -0,0 +1,322 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Gravador de voo: log circular em disco do PCM bruto de cada microfone.
+
+Estrutura em disco (um diretório por microfone):
+
+    <diretorio>/<mic>/00000012.pcm    PCM bruto, somente append
+    <diretorio>/<mic>/00000012.jsonl  cabeçalho do segmento + eventos
+
+A primeira linha de cada .jsonl é o cabeçalho do segmento (posição da
+primeira amostra, formato do áudio). As linhas seguintes são os eventos de
+frase (início/fim em amostras globais, transcrição e tempos). Apenas os
+últimos N minutos são mantidos: ao abrir um segmento novo os mais antigos
+são apagados.
+
+Uso do replay:
+    python3 core/flight_recorder.py list flight_recorder --mic arduino
+    python3 System-arduino/voice_assistant_arduino.py --replay flight_recorder 4
+
+Pela rede (não determinístico), com o assistente em --replay-tcp:
+    python3 core/flight_recorder.py replay flight_recorder --mic arduino --speed 4
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import socket
+import threading
+import time
+
+SAMPLE_RATE = 16000
+SAMPLE_WIDTH = 2  # 16-bit
+CHANNELS = 1
+# Segmentos com um número inteiro de frames do engine (512 amostras): um
+# replay a partir de qualquer segmento cai no mesmo recorte de frames
+SEGMENT_ALIGN = 512
+
+
+class FlightRecorder:
+    """Grava o PCM bruto de um microfone em segmentos circulares"""
+
+    def __init__(self, directory, mic_name='mic', minutes=5, segment_seconds=30,
+                 sample_rate=SAMPLE_RATE, sample_width=SAMPLE_WIDTH, channels=CHANNELS):
+        self.directory = os.path.join(directory, mic_name)
+        self.mic_name = mic_name
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.channels = channels
+        self.frame_bytes = sample_width * channels
+        segment_samples = int(segment_seconds * sample_rate)
+        segment_samples += -segment_samples % SEGMENT_ALIGN
+        self.segment_bytes = segment_samples * self.frame_bytes
+        self.max_segments = max(1, int(math.ceil(minutes * 60.0 / segment_seconds)))
+        self.lock = threading.Lock()
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        # Continuar a numeração e a posição global de onde a última sessão parou
+        self.seq = 0
+        self.position = 0  # em amostras
+        segments = list_segments(self.directory)
+        if segments:
+            last_seq, last_header = segments[-1]
+            last_size = os.path.getsize(segment_path(self.directory, last_seq, '.pcm'))
+            self.seq = last_seq + 1
+            self.position = last_header['first_sample'] + last_size // self.frame_bytes
+
+        self.pcm_file = None
+        self.events_file = None
+        self.segment_written = 0
+        self.pending = b''  # byte ímpar que ainda não forma uma amostra
+        self._open_segment()
+
+    def _open_segment(self):
+        """Abre um segmento novo e apaga os que passaram do limite"""
+        if self.pcm_file:
+            self.pcm_file.close()
+            self.events_file.close()
+            self.seq += 1
+
+        self.pcm_file = open(segment_path(self.directory, self.seq, '.pcm'), 'ab', buffering=64 * 1024)
+        self.events_file = open(segment_path(self.directory, self.seq, '.jsonl'), 'a')
+        self.segment_written = 0
+
+        header = {
+            'type': 'segment',
+            'seq': self.seq,
+            'first_sample': self.position,
+            'sample_rate': self.sample_rate,
+            'sample_width': self.sample_width,
+            'channels': self.channels,
+            'time': time.time(),
+        }
+        self.events_file.write(json.dumps(header) + '\n')
+        self.events_file.flush()
+
+        for seq, _ in list_segments(self.directory)[:-self.max_segments]:
+            # Índice antes do áudio: um .jsonl nunca aponta para um .pcm já apagado
+            for suffix in ('.jsonl', '.pcm'):
+                try:
+                    os.unlink(segment_path(self.directory, seq, suffix))
+                except OSError:
+                    pass
+
+    def write(self, data):
+        """Acrescenta PCM bruto ao segmento atual"""
+        with self.lock:
+            if self.pcm_file is None:
+                return
+            data = self.pending + bytes(data)
+            usable = len(data) - len(data) % self.frame_bytes
+            self.pending = data[usable:]
+            data = data[:usable]
+
+            while data:
+                room = self.segment_bytes - self.segment_written
+                if room <= 0:
+                    self._open_segment()
+                    room = self.segment_bytes
+                chunk = data[:room]
+                self.pcm_file.write(chunk)
+                self.segment_written += len(chunk)
+                self.position += len(chunk) // self.frame_bytes
+                data = data[room:]
+
+    def tell(self):
+        """Posição atual do gravador, em amostras"""
+        with self.lock:
+            return self.position
+
+    def log_utterance(self, start, end, transcript=None, **timings):
+        """Registra os limites de uma frase, a transcrição e os tempos medidos"""
+        event = {
+            'type': 'utterance',
+            'start': start,
+            'end': end,
+            'transcript': transcript,
+            'time': time.time(),
+            'timings': timings,
+        }
+        with self.lock:
+            if self.events_file is None:
+                return
+            self.events_file.write(json.dumps(event, ensure_ascii=False) + '\n')
+            self.events_file.flush()
+            # Garantir que o áudio da frase já está no disco junto com o evento
+            self.pcm_file.flush()
+
+    def close(self):
+        with self.lock:
+            if self.pcm_file:
+                self.pcm_file.close()
+                self.events_file.close()
+                self.pcm_file = None
+                self.events_file = None
+
+
+class FlightLog:
+    """Leitura (via mmap) dos segmentos gravados por um FlightRecorder"""
+
+    def __init__(self, directory, mic_name='mic'):
+        self.directory = os.path.join(directory, mic_name)
+        self.segments = list_segments(self.directory)
+        if not self.segments:
+            raise FileNotFoundError(f"Nenhum segmento gravado em {self.directory}")
+
+        header = self.segments[0][1]
+        self.sample_rate = header['sample_rate']
+        self.sample_width = header['sample_width']
+        self.channels = header['channels']
+        self.frame_bytes = self.sample_width * self.channels
+
+    def utterances(self):
+        """Lista os eventos de frase, do mais antigo para o mais recente"""
+        events = []
+        for seq, _ in self.segments:
+            with open(segment_path(self.directory, seq, '.jsonl')) as f:
+                for line in f:
+                    try:
+                        event = json.loads(line)
+                    except ValueError:
+                        continue  # Linha truncada por queda de energia
+                    if event.get('type') == 'utterance':
+                        events.append(event)
+        return events
+
+    def chunks(self, chunk_size=1024, start=None, end=None):
+        """Gera o PCM gravado em blocos de chunk_size bytes.
+
+        start e end são posições globais em amostras (None = tudo).
+        """
+        chunk_size -= chunk_size % self.frame_bytes
+        for seq, header in self.segments:
+            path = segment_path(self.directory, seq, '.pcm')
+            size = os.path.getsize(path)
+            size -= size % self.frame_bytes
+            if size == 0:
+                continue
+
+            first = header['first_sample']
+            last = first + size // self.frame_bytes
+            lo = first if start is None else max(first, start)
+            hi = last if end is None else min(last, end)
+            if lo >= hi:
+                continue
+
+            with open(path, 'rb') as f:
+                with mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ) as data:
+                    offset = (lo - first) * self.frame_bytes
+                    stop = (hi - first) * self.frame_bytes
+                    while offset < stop:
+                        yield data[offset:min(offset + chunk_size, stop)]
+                        offset += chunk_size
+
+    def read(self, start, end):
+        """Retorna o PCM entre duas posições globais (em amostras)"""
+        return b''.join(self.chunks(64 * 1024, start, end))
+
+    def paced_chunks(self, chunk_size=1024, speed=1.0, start=None, end=None):
+        """Como chunks(), mas no ritmo do tempo real dividido por speed.
+
+        speed <= 0 entrega tudo o mais rápido possível.
+        """
+        bytes_per_second = float(self.sample_rate * self.frame_bytes)
+        started = time.monotonic()
+        sent = 0
+        for chunk in self.chunks(chunk_size, start, end):
+            if speed > 0:
+                due = started + sent / bytes_per_second / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            yield chunk
+            sent += len(chunk)
+
+
+def segment_path(directory, seq, suffix):
+    return os.path.join(directory, f"{seq:08d}{suffix}")
+
+
+def list_segments(directory):
+    """Retorna [(seq, cabeçalho)] dos segmentos existentes, em ordem"""
+    if not os.path.isdir(directory):
+        return []
+
+    segments = []
+    for name in os.listdir(directory):
+        base, ext = os.path.splitext(name)
+        if ext != '.jsonl' or not base.isdigit():
+            continue
+        if not os.path.exists(segment_path(directory, int(base), '.pcm')):
+            continue  # Rotação interrompida: índice sem o áudio
+        try:
+            with open(os.path.join(directory, name)) as f:
+                header = json.loads(f.readline())
+        except (OSError, ValueError):
+            continue
+        if header.get('type') == 'segment':
+            segments.append((int(base), header))
+
+    segments.sort(key=lambda item: item[0])
+    return segments
+
+
+def replay_tcp(log, host='127.0.0.1', port=5555, speed=1.0, start=None, end=None):
+    """Faz o papel do Arduino: conecta à porta TCP do assistente e envia o PCM gravado.
+
+    Testa o caminho de rede, mas não é determinístico: a fonte TCP é ao vivo e
+    descarta frames quando o assistente atrasa. O assistente deve rodar com
+    --replay-tcp (sem gravador, senão ele grava o próprio replay).
+    """
+    print(f"Conectando em {host}:{port}...")
+    sock = socket.create_connection((host, port))
+    sent = 0
+    started = time.monotonic()
+    try:
+        # O Arduino envia blocos de 512 amostras (1024 bytes)
+        for chunk in log.paced_chunks(1024, speed, start, end):
+            sock.sendall(chunk)
+            sent += len(chunk)
+    finally:
+        sock.close()
+
+    elapsed = time.monotonic() - started
+    audio_seconds = sent / float(log.sample_rate * log.frame_bytes)
+    print(f"Replay concluído: {audio_seconds:.1f}s de áudio em {elapsed:.1f}s")
+    return sent
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gravador de voo do assistente de voz")
+    parser.add_argument('command', choices=['list', 'replay'])
+    parser.add_argument('directory')
+    parser.add_argument('--mic', default='arduino')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5555)
+    parser.add_argument('--speed', type=float, default=1.0,
+                        help="1 = tempo real, 4 = quatro vezes mais rápido, 0 = sem pausa")
+    parser.add_argument('--utterance', type=int,
+                        help="Reproduzir só a frase com este índice (ver 'list')")
+    args = parser.parse_args()
+
+    log = FlightLog(args.directory, args.mic)
+
+    if args.command == 'list':
+        for index, event in enumerate(log.utterances()):
+            seconds = (event['end'] - event['start']) / float(log.sample_rate)
+            timings = ', '.join(f"{k}={v:.2f}s" for k, v in event['timings'].items())
+            print(f"{index:3d}: {seconds:5.1f}s '{event['transcript']}' {timings}")
+        return
+
+    start = end = None
+    if args.utterance is not None:
+        event = log.utterances()[args.utterance]
+        start, end = event['start'], event['end']
+    replay_tcp(log, args.host, args.port, args.speed, start, end)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""Importações preguiçosas e instâncias compartilhadas para economizar memória.
+
+Os módulos pesados (speech_recognition, pyttsx3, pyaudio, serial) só são
+carregados no primeiro uso, e o motor TTS e o Recognizer são criados uma
+única vez e reutilizados pelos autotestes e pelo assistente.
+"""
+
+import importlib
+import os
+import resource
+import sys
+import time
+
+# Tempo de importação de cada módulo carregado sob demanda (em segundos)
+IMPORT_TIMES = {}
+
+_shared = {}
+
+
+class SuppressStderr:
+    """Redireciona o stderr (mensagens do ALSA/JACK) para /dev/null"""
+
+    def __init__(self):
+        self.null_fd = os.open(os.devnull, os.O_RDWR)
+        self.save_fd = os.dup(2)
+
+    def __enter__(self):
+        os.dup2(self.null_fd, 2)
+
+    def __exit__(self, *args):
+        os.dup2(self.save_fd, 2)
+        os.close(self.null_fd)
+        os.close(self.save_fd)
+
+
+def load(name):
+    """Importa um módulo registrando quanto tempo levou"""
+    if name in sys.modules:
+        return sys.modules[name]
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    IMPORT_TIMES[name] = time.perf_counter() - started
+    return module
+
+
+def shared_tts():
+    """Motor pyttsx3 único para o processo"""
+    if 'tts' not in _shared:
+        _shared['tts'] = load('pyttsx3').init()
+    return _shared['tts']
+
+
+def shared_recognizer():
+    """Recognizer único para o processo (a calibração de ruído fica no StreamingEngine)"""
+    if 'recognizer' not in _shared:
+        _shared['recognizer'] = load('speech_recognition').Recognizer()
+    return _shared['recognizer']
+
+
+def peak_rss_kb():
+    """Pico de memória residente do processo, em KB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == 'darwin':
+        peak //= 1024  # No macOS ru_maxrss vem em bytes
+    return peak
+
+
+def report():
+    """Imprime os tempos de importação (no estilo de -X importtime) e o pico de RSS"""
+    print("Tempo de importação sob demanda:")
+    print(f"  {'us':>10} | módulo")
+    for name, seconds in sorted(IMPORT_TIMES.items(), key=lambda item: -item[1]):
+        print(f"  {int(seconds * 1e6):>10} | {name}")
+    print(f"Pico de RSS: {peak_rss_kb() / 1024.0:.1f} MB")
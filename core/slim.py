@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Ponto de entrada enxuto para o Dev Board.
+
+Sobe o assistente sem os autotestes interativos (demonstração de voz,
+calibração extra do microfone, gravação de teste do Arduino) e com os
+módulos pesados carregados só quando usados. Com --bench apenas mede o
+custo de inicialização.
+
+Uso:
+    python3 core/slim.py usb
+    python3 core/slim.py arduino
+    python3 core/slim.py usb --bench
+    python3 core/slim.py usb --bench-engine [arquivo.wav]
+"""
+
+import argparse
+import importlib.util
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from core import runtime
+from core.audio_source import SyntheticSource, WavFileSource
+from core.engine import StreamingEngine
+
+SCRIPTS = {
+    'usb': os.path.join(ROOT, 'System-mic', 'voice_assistant.py'),
+    'arduino': os.path.join(ROOT, 'System-arduino', 'voice_assistant_arduino.py'),
+}
+
+# Subsistemas que cada sistema carrega ao começar a escutar
+SUBSYSTEMS = {
+    'usb': ['speech_recognition', 'pyaudio', 'pyttsx3'],
+    'arduino': ['speech_recognition', 'pyttsx3'],
+}
+
+
+def load_script(system):
+    """Importa o script do sistema como módulo, sem executar o __main__"""
+    name = f"voice_assistant_{system}"
+    spec = importlib.util.spec_from_file_location(name, SCRIPTS[system])
+    module = importlib.util.module_from_spec(spec)
+    started = time.perf_counter()
+    spec.loader.exec_module(module)
+    runtime.IMPORT_TIMES[os.path.basename(SCRIPTS[system])] = time.perf_counter() - started
+    return module
+
+
+def bench(system):
+    """Mede tempo e pico de memória de cada etapa da inicialização"""
+    print(f"=== Benchmark de inicialização ({system}) ===")
+    print(f"{'etapa':<28} {'tempo':>8} {'pico RSS':>10}")
+
+    def stage(label, action):
+        started = time.perf_counter()
+        try:
+            action()
+        except Exception as e:
+            print(f"{label:<28} falhou: {e}")
+            return
+        elapsed = time.perf_counter() - started
+        print(f"{label:<28} {elapsed * 1000:>6.0f}ms {runtime.peak_rss_kb() / 1024.0:>8.1f}MB")
+
+    stage("interpretador", lambda: None)
+    modules = []
+    stage("script carregado", lambda: modules.append(load_script(system)))
+
+    subsystems = list(SUBSYSTEMS[system])
+    if system == 'arduino' and modules and not modules[0].USE_WIFI:
+        subsystems.append('serial')
+    for name in subsystems:
+        stage(f"import {name}", lambda name=name: runtime.load(name))
+
+    stage("Recognizer compartilhado", runtime.shared_recognizer)
+    stage("motor TTS compartilhado", runtime.shared_tts)
+
+    print()
+    runtime.report()
+
+
+def bench_engine(path=None):
+    """Mede a detecção de frases sem microfone nem rede (WAV ou áudio sintético)"""
+    if path:
+        source = WavFileSource(path)
+    else:
+        # 20 frases de 1,5 s separadas por 1 s de silêncio
+        source = SyntheticSource(repeat=20)
+    print(f"=== Benchmark do engine ({source.name}) ===")
+
+    with source:
+        engine = StreamingEngine(source)
+        engine.start()
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        count = 0
+        for utterance in engine.utterances():
+            count += 1
+        elapsed = time.perf_counter() - started
+        cpu = time.process_time() - cpu_started
+        engine.stop()
+
+    audio_seconds = engine.position / float(source.sample_rate)
+    print(f"Frases detectadas: {count}")
+    print(f"Áudio processado: {audio_seconds:.1f}s em {elapsed:.2f}s ({audio_seconds / max(elapsed, 1e-9):.0f}x tempo real)")
+    print(f"CPU: {cpu:.2f}s ({100.0 * cpu / audio_seconds:.1f}% de um núcleo em tempo real)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Assistente de voz em modo enxuto")
+    parser.add_argument('system', nargs='?', default='usb', choices=sorted(SCRIPTS))
+    parser.add_argument('--bench', action='store_true',
+                        help="Apenas medir importação e memória, sem iniciar o assistente")
+    parser.add_argument('--bench-engine', nargs='?', const='', metavar='WAV',
+                        help="Medir o engine com um WAV ou com áudio sintético")
+    args = parser.parse_args()
+
+    if args.bench_engine is not None:
+        bench_engine(args.bench_engine or None)
+        return
+
+    if args.bench:
+        bench(args.system)
+        return
+
+    module = load_script(args.system)
+    assistant = module.VoiceAssistant()
+    assistant.self_test = False  # Sem o teste de gravação do Arduino
+    assistant.start_listening()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""Supervisor de saúde das fontes de áudio.
+
+Acompanha, para cada StreamingEngine, a taxa de dados e a idade do último
+frame. Se a thread de captura morrer (exceção, Arduino desconectado) ou a
+fonte parar de mandar dados, a fonte é reaberta (socket refeito, M-305
+procurado de novo) e a captura reiniciada, com espera exponencial entre as
+tentativas. O tempo até o primeiro frame depois da falha fica nas métricas.
+
+Teste de injeção de falhas (sockets locais que caem no meio do fluxo):
+    python3 core/supervisor.py
+"""
+
+import os
+import socket
+import sys
+import threading
+import time
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core.audio_source import ArduinoTCPSource, SyntheticSource
+from core.engine import StreamingEngine
+
+
+class Supervisor:
+    """Vigia as fontes e recupera as que caírem"""
+
+    def __init__(self, check_interval=0.5, stall_timeout=3.0,
+                 backoff_start=0.5, backoff_max=30.0):
+        self.check_interval = check_interval
+        self.stall_timeout = stall_timeout
+        self.backoff_start = backoff_start
+        self.backoff_max = backoff_max
+        self.engines = []
+        self.metrics = {}
+        self.running = False
+        self.thread = None
+        self.lock = threading.Lock()
+
+    def watch(self, engine):
+        """Passa a supervisionar um engine (já iniciado)"""
+        engine.restartable = True
+        with self.lock:
+            self.engines.append(engine)
+            self.metrics[engine.source.name] = {
+                'data_rate': 0.0,        # bytes/s no último intervalo
+                'last_frame_age': None,  # segundos desde o último frame
+                'failures': 0,
+                'recoveries': 0,
+                'last_recovery_time': None,  # falha -> primeiro frame novo (s)
+                'recovery_times': [],
+            }
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.monitor_loop)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.running = False
+        for engine in self.engines:
+            engine.restartable = False
+        if self.thread:
+            self.thread.join(timeout=self.check_interval * 2)
+
+    def monitor_loop(self):
+        last_positions = {}
+        last_check = time.monotonic()
+        while self.running:
+            time.sleep(self.check_interval)
+            now = time.monotonic()
+            interval = now - last_check
+            last_check = now
+
+            with self.lock:
+                engines = list(self.engines)
+            for engine in engines:
+                if not self.running:
+                    return
+                metrics = self.metrics[engine.source.name]
+                source = engine.source
+
+                captured = engine.position - last_positions.get(engine, engine.position)
+                last_positions[engine] = engine.position
+                metrics['data_rate'] = captured * source.sample_width / interval
+
+                # Sem nenhum frame ainda: conta a idade a partir do início da captura
+                last_frame = engine.last_frame_time or engine.started_time or now
+                metrics['last_frame_age'] = now - last_frame
+
+                if not engine.capture_alive:
+                    self.recover(engine, "thread de captura encerrada")
+                elif metrics['last_frame_age'] > self.stall_timeout:
+                    self.recover(engine, f"sem dados há {metrics['last_frame_age']:.1f}s")
+
+    def recover(self, engine, reason):
+        """Reabre a fonte e reinicia a captura, com espera exponencial"""
+        source = engine.source
+        metrics = self.metrics[source.name]
+        metrics['failures'] += 1
+        failed_at = time.monotonic()
+        print(f"⚠️ Fonte '{source.name}' com problema ({reason}). Recuperando...")
+
+        # Derrubar a captura antiga: o flag a encerra no próximo frame e
+        # desconectar a fonte acorda uma leitura bloqueada
+        engine.stopping = True
+        try:
+            source.disconnect()
+        except Exception:
+            pass
+        if engine.capture_thread:
+            engine.capture_thread.join(timeout=2.0)
+        if engine.capture_alive:
+            # Nunca duas capturas na mesma fonte; o próximo ciclo tenta de novo
+            print("Captura antiga ainda não terminou. Nova tentativa em seguida")
+            return
+
+        backoff = self.backoff_start
+        attempt = 0
+        while self.running:
+            attempt += 1
+            try:
+                source.reopen()
+                break
+            except Exception as e:
+                print(f"Tentativa {attempt} falhou: {e}. Nova tentativa em {backoff:.1f}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
+        if not self.running:
+            return
+
+        engine.last_frame_time = None
+        engine.start()
+
+        # Medir até o primeiro frame depois da falha
+        while self.running and engine.last_frame_time is None and engine.capture_alive:
+            time.sleep(0.01)
+        if engine.last_frame_time is None:
+            return  # Caiu de novo; o próximo ciclo do monitor trata
+
+        recovery_time = engine.last_frame_time - failed_at
+        metrics['recoveries'] += 1
+        metrics['last_recovery_time'] = recovery_time
+        metrics['recovery_times'].append(recovery_time)
+        print(f"✅ Fonte '{source.name}' recuperada em {recovery_time:.2f}s")
+
+    def report(self):
+        """Imprime as métricas de cada fonte"""
+        for name, metrics in self.metrics.items():
+            age = metrics['last_frame_age']
+            last = metrics['last_recovery_time']
+            print(f"{name}: {metrics['data_rate'] / 1000.0:.1f} kB/s, "
+                  f"último frame há {age if age is not None else 0:.1f}s, "
+                  f"{metrics['failures']} falhas, {metrics['recoveries']} recuperações"
+                  + (f", última em {last:.2f}s" if last is not None else ""))
+
+
+def fake_arduino(port, scenario, stop):
+    """Cliente que faz o papel do Arduino e injeta falhas no fluxo.
+
+    scenario: lista de (ação, segundos) com ação 'send' (manda áudio),
+    'stall' (fica conectado sem mandar nada) ou 'drop' (derruba a conexão e
+    espera antes de reconectar, como o sketch faz).
+    """
+    audio = SyntheticSource(pattern=[('noise', 3600)], amplitude=500)
+    audio.open()
+    conn = None
+    for action, seconds in scenario:
+        if stop.is_set():
+            break
+        if conn is None and action != 'drop':
+            while not stop.is_set():
+                try:
+                    conn = socket.create_connection(('127.0.0.1', port), timeout=1)
+                    break
+                except OSError:
+                    time.sleep(0.05)
+        deadline = time.monotonic() + seconds
+        if action == 'send':
+            while time.monotonic() < deadline and not stop.is_set():
+                try:
+                    conn.sendall(audio.read(1024))
+                except OSError:
+                    break
+                time.sleep(0.032)  # 512 amostras a 16 kHz
+        elif action == 'drop':
+            if conn:
+                conn.close()
+                conn = None
+            time.sleep(seconds)
+        else:
+            time.sleep(seconds)
+    if conn:
+        conn.close()
+
+
+def test_fault_injection():
+    """Arduino falso cai no meio do fluxo e trava; o supervisor deve recuperar as duas vezes"""
+    print("=== TESTE DE INJEÇÃO DE FALHAS ===")
+    # Porta livre para o servidor (o Arduino falso conecta nela)
+    probe = socket.socket()
+    probe.bind(('127.0.0.1', 0))
+    port = probe.getsockname()[1]
+    probe.close()
+
+    stop = threading.Event()
+    scenario = [('send', 1.0), ('drop', 0.5), ('send', 1.0), ('stall', 3.0), ('drop', 0.2), ('send', 1.0)]
+    client = threading.Thread(target=fake_arduino, args=(port, scenario, stop))
+    client.daemon = True
+    client.start()
+
+    source = ArduinoTCPSource(port, host='127.0.0.1', accept_timeout=5)
+    source.open()
+    engine = StreamingEngine(source)
+    engine.start()
+
+    supervisor = Supervisor(check_interval=0.1, stall_timeout=1.0, backoff_start=0.1)
+    supervisor.watch(engine)
+    supervisor.start()
+
+    # Consumir os frames como o assistente faria
+    frames = [0]
+
+    def consume():
+        for _ in engine.frames():
+            frames[0] += 1
+
+    consumer = threading.Thread(target=consume)
+    consumer.daemon = True
+    consumer.start()
+
+    client.join(timeout=15)
+    time.sleep(0.5)
+    stop.set()
+    supervisor.stop()
+    engine.stop()
+    source.close()
+
+    metrics = supervisor.metrics[source.name]
+    supervisor.report()
+    print(f"Frames recebidos: {frames[0]}")
+
+    ok = metrics['recoveries'] >= 2 and frames[0] > 0 and consumer.is_alive()
+    if ok:
+        print("✅ Supervisor recuperou da queda e do travamento")
+    else:
+        print("❌ Supervisor não recuperou a fonte")
+    return ok
+
+
+if __name__ == "__main__":
+    sys.exit(0 if test_fault_injection() else 1)
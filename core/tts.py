@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""Saída de voz em streaming: divide a resposta em frases e toca cada
+trecho enquanto o próximo é sintetizado.
+
+O motor de síntese fica atrás da interface TTSEngine, assim outro motor
+(festival, flite, um serviço online...) pode substituir o pyttsx3.
+"""
+
+import os
+import queue
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+
+# Fim de frase seguido de espaço (dentro de uma linha)
+SENTENCE_BREAK = re.compile(r'(?<=[.!?])\s+')
+LIST_MARKER = re.compile(r'^(?:[-*•]|\d+[.)])\s+')
+
+
+def split_text(text, max_chars=200):
+    """Divide o texto em trechos curtos nos limites de frase e de lista"""
+    # Cada linha é um item: o marcador sai antes de dividir as frases,
+    # senão "1." viraria um trecho sozinho
+    parts = []
+    for line in text.splitlines():
+        parts.extend(SENTENCE_BREAK.split(LIST_MARKER.sub('', line.strip())))
+
+    chunks = []
+    for part in parts:
+        part = part.strip()
+        if not part:
+            continue
+        # Frases muito longas: quebrar nas vírgulas para não atrasar o primeiro áudio
+        while len(part) > max_chars:
+            cut = part.rfind(', ', 0, max_chars)
+            if cut <= 0:
+                break
+            chunks.append(part[:cut + 1])
+            part = part[cut + 2:]
+        chunks.append(part)
+    return chunks
+
+
+class TTSEngine:
+    """Interface de um motor de síntese para o StreamingSpeaker"""
+
+    def synthesize(self, text):
+        """Sintetiza o texto e retorna um clipe que possa ser passado a play()"""
+        raise NotImplementedError
+
+    def play(self, clip):
+        """Toca o clipe e bloqueia até o fim (ou até stop())"""
+        raise NotImplementedError
+
+    def stop(self):
+        """Interrompe a reprodução em andamento"""
+
+    def discard(self, clip):
+        """Libera um clipe que não vai mais ser tocado"""
+
+
+class Pyttsx3Engine(TTSEngine):
+    """pyttsx3 sintetizando para WAV e aplay tocando o arquivo.
+
+    Sem o player instalado, cada trecho é falado direto com say()/runAndWait()
+    (sem sobrepor síntese e reprodução, mas sem ficar mudo).
+    """
+
+    def __init__(self, engine, player=('aplay', '-q')):
+        self.engine = engine  # Instância pyttsx3 já configurada (voz, rate, volume)
+        self.player = list(player)
+        self.streaming = shutil.which(self.player[0]) is not None
+        self.process = None
+        self.lock = threading.Lock()
+        if not self.streaming:
+            print(f"{self.player[0]} não encontrado; usando a fala direta do pyttsx3")
+
+    def synthesize(self, text):
+        if not self.streaming:
+            return text  # O próprio texto é o clipe; play() fala direto
+        fd, path = tempfile.mkstemp(suffix='.wav')
+        os.close(fd)
+        try:
+            with self.lock:
+                self.engine.save_to_file(text, path)
+                self.engine.runAndWait()
+        except Exception:
+            self.discard(path)
+            raise
+        return path
+
+    def play(self, clip):
+        if not self.streaming:
+            with self.lock:
+                self.engine.say(clip)
+                self.engine.runAndWait()
+            return
+        try:
+            self.process = subprocess.Popen(self.player + [clip],
+                                            stdout=subprocess.DEVNULL,
+                                            stderr=subprocess.DEVNULL)
+            self.process.wait()
+        finally:
+            self.process = None
+            self.discard(clip)
+
+    def stop(self):
+        process = self.process
+        if process and process.poll() is None:
+            process.terminate()
+
+    def discard(self, clip):
+        if not self.streaming:
+            return
+        try:
+            os.unlink(clip)
+        except OSError:
+            pass
+
+
+class StreamingSpeaker:
+    """Toca o trecho N enquanto o trecho N+1 é sintetizado"""
+
+    def __init__(self, engine, lookahead=1, max_chars=200):
+        self.engine = engine
+        self.lookahead = lookahead
+        self.max_chars = max_chars
+        self.cancelled = threading.Event()
+
+    def speak(self, text):
+        """Fala o texto em trechos. Retorna os tempos medidos (em segundos)"""
+        self.cancelled.clear()
+        chunks = split_text(text, self.max_chars)
+        clips = queue.Queue(maxsize=self.lookahead)
+        started = time.time()
+        stats = {'chunks': len(chunks), 'first_audio': None, 'total': 0.0, 'cancelled': False}
+
+        def produce():
+            for chunk in chunks:
+                if self.cancelled.is_set():
+                    break
+                try:
+                    clip = self.engine.synthesize(chunk)
+                except Exception as e:
+                    print(f"Erro na síntese: {e}")
+                    break
+                clips.put(clip)
+            clips.put(None)
+
+        producer = threading.Thread(target=produce)
+        producer.daemon = True
+        producer.start()
+
+        finished = False
+        try:
+            while True:
+                clip = clips.get()
+                if clip is None:
+                    finished = True
+                    break
+                if self.cancelled.is_set():
+                    # Cancelado entre trechos: descartar o que já foi sintetizado
+                    self.engine.discard(clip)
+                    continue
+                if stats['first_audio'] is None:
+                    stats['first_audio'] = time.time() - started
+                self.engine.play(clip)
+            stats['cancelled'] = self.cancelled.is_set()
+        finally:
+            # Erro ou Ctrl+C no meio da fala: parar o produtor e apagar os clipes na fila
+            self.cancelled.set()
+            while not finished:
+                clip = clips.get()
+                if clip is None:
+                    finished = True
+                else:
+                    self.engine.discard(clip)
+            producer.join()
+
+        stats['total'] = time.time() - started
+        return stats
+
+    def cancel(self):
+        """Interrompe a fala atual; pode ser chamado de outra thread"""
+        self.cancelled.set()
+        self.engine.stop()